@@ -0,0 +1,73 @@
+import os
+import bisect
+import pickle
+import threading
+
+class ProductNameIndex:
+    # In-memory prefix index of known product names, one sorted list per category
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def add(self, category, name):
+        if not isinstance(name, str) or not name.strip():
+            return
+        name = name.strip()
+        entry = (name.lower(), name)
+        with self._lock:
+            entries = self._entries.setdefault(category, [])
+            position = bisect.bisect_left(entries, entry)
+            if position == len(entries) or entries[position] != entry:
+                entries.insert(position, entry)
+
+    def contains(self, category, name):
+        key = name.strip().lower()
+        if not key:
+            return False
+        with self._lock:
+            entries = self._entries.get(category, [])
+            position = bisect.bisect_left(entries, (key,))
+            return position < len(entries) and entries[position][0] == key
+
+    def complete(self, category, prefix, limit=10):
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        with self._lock:
+            entries = self._entries.get(category, [])
+            position = bisect.bisect_left(entries, (prefix,))
+            names = []
+            while position < len(entries) and len(names) < limit:
+                key, name = entries[position]
+                if not key.startswith(prefix):
+                    break
+                names.append(name)
+                position += 1
+        return names
+
+    def load_cache(self, cache_dir, categories):
+        if not os.path.isdir(cache_dir):
+            return
+        for filename in os.listdir(cache_dir):
+            category, _, rest = filename.partition("_")
+            if category not in categories or not filename.endswith(".pkl"):
+                continue
+            name = rest[:-len(".pkl")].replace("_", " ")
+            try:
+                with open(os.path.join(cache_dir, filename), 'rb') as f:
+                    cached = pickle.load(f)
+                if isinstance(cached, dict) and cached.get("name"):
+                    name = cached["name"]
+            except Exception as e:
+                print(f"Error reading cache file {filename}: {str(e)}")
+            self.add(category, name)
+
+    def load_catalog(self, db, categories):
+        for category in categories:
+            for name in db[category].distinct("name"):
+                self.add(category, name)
+
+    def load(self, db, cache_dir, categories):
+        # Cache first: it is local and fills the index even if MongoDB is unreachable
+        self.load_cache(cache_dir, categories)
+        self.load_catalog(db, categories)
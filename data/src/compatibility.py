@@ -0,0 +1,270 @@
+import re
+import time
+import threading
+
+from pymongo.errors import OperationFailure
+
+CHANGE_STREAM_HISTORY_LOST = 286
+
+# Tags from different categories that describe the same physical interface.
+# Each axis maps a category to the compatibilityTags key it is stored under;
+# two parts constrain each other on every axis they both carry.
+COMPATIBILITY_AXES = {
+    "Drone Type": {category: "Drone Type" for category in [
+        "frames", "propellers", "motors", "batteries", "flightcontrollers",
+        "escs", "videotransmitters", "vtxantenna", "fpvcameras", "receivers"
+    ]},
+    "Stack Mount": {"frames": "Stack Mount", "flightcontrollers": "Size", "escs": "Size"},
+    "Motor Mount": {"frames": "Motor Mount", "motors": "Mounting Pattern"},
+    "Cell Count": {"motors": "Voltage", "batteries": "Voltage", "flightcontrollers": "Voltage", "escs": "Voltage"},
+    "VTX Mount": {"frames": "VTX Mount", "videotransmitters": "Mount Size"},
+    "Camera Size": {"frames": "Camera Size", "fpvcameras": "Size"},
+    "Prop Mount": {"motors": "Prop Mounting Type", "propellers": "Mounting Type"},
+    "Shaft": {"motors": "Shaft Diameter", "propellers": "Bore"}
+}
+
+def _normalize_numbers(value):
+    return re.sub(r"\d+(?:\.\d+)?", lambda m: format(float(m.group()), "g"), value)
+
+def canonical_values(axis, value):
+    value = re.sub(r"\s+", "", str(value)).lower()
+    if axis == "Motor Mount":
+        # "4-M3-16x16mm" and "4-16x16mm" describe the same hole pattern
+        value = re.sub(r"-m\d+(?:\.\d+)?-", "-", value)
+    if axis == "Cell Count":
+        # ESCs list ranges ("3-6S") while batteries list a single cell count
+        match = re.fullmatch(r"(\d+)(?:-(\d+))?s", value)
+        if match:
+            low = int(match.group(1))
+            high = int(match.group(2) or low)
+            return [f"{cells}s" for cells in range(low, high + 1)]
+    return [_normalize_numbers(value)]
+
+def iter_rows(bitset):
+    return [row for row, bit in enumerate(reversed(bin(bitset)[2:])) if bit == "1"]
+
+class CategoryIndex:
+    # Array-backed index for one category. Each row holds a part; for every axis
+    # the index keeps the part's value bitset and, per value bit, the bitset of
+    # rows carrying that value, so a constraint resolves to a handful of ORs.
+    def __init__(self, axes):
+        self.ids = []
+        self.names = []
+        self.rows = {}
+        self.free_rows = []
+        self.live = 0
+        self.masks = {axis: [] for axis in axes}
+        self.postings = {axis: [] for axis in axes}
+        self.untagged = {axis: 0 for axis in axes}
+
+    def _allocate(self, part_id):
+        if self.free_rows:
+            row = self.free_rows.pop()
+            self.ids[row] = part_id
+        else:
+            row = len(self.ids)
+            self.ids.append(part_id)
+            self.names.append(None)
+            for masks in self.masks.values():
+                masks.append(0)
+        self.rows[part_id] = row
+        return row
+
+    def _clear(self, row):
+        bit = 1 << row
+        for axis, masks in self.masks.items():
+            for value_bit in iter_rows(masks[row]):
+                self.postings[axis][value_bit] &= ~bit
+            masks[row] = 0
+            self.untagged[axis] &= ~bit
+        self.live &= ~bit
+
+    def put(self, part_id, name, masks):
+        row = self.rows.get(part_id)
+        if row is None:
+            row = self._allocate(part_id)
+        else:
+            self._clear(row)
+
+        bit = 1 << row
+        self.names[row] = name
+        for axis in self.masks:
+            mask = masks.get(axis, 0)
+            self.masks[axis][row] = mask
+            if not mask:
+                self.untagged[axis] |= bit
+                continue
+            postings = self.postings[axis]
+            for value_bit in iter_rows(mask):
+                while len(postings) <= value_bit:
+                    postings.append(0)
+                postings[value_bit] |= bit
+        self.live |= bit
+
+    def remove(self, part_id):
+        row = self.rows.pop(part_id, None)
+        if row is None:
+            return
+        self._clear(row)
+        self.ids[row] = None
+        self.names[row] = None
+        self.free_rows.append(row)
+
+    def matching(self, axis, mask):
+        # Rows sharing at least one value with mask; untagged rows never exclude
+        rows = self.untagged[axis]
+        postings = self.postings[axis]
+        for value_bit in iter_rows(mask):
+            if value_bit < len(postings):
+                rows |= postings[value_bit]
+        return rows
+
+class CompatibilityEngine:
+    def __init__(self, axes=COMPATIBILITY_AXES):
+        self.axes = axes
+        self.category_axes = {}
+        for axis, tags in axes.items():
+            for category, tag in tags.items():
+                self.category_axes.setdefault(category, {})[axis] = tag
+        self.vocab = {axis: {} for axis in axes}
+        self.indexes = {category: CategoryIndex(category_axes) for category, category_axes in self.category_axes.items()}
+        self._lock = threading.RLock()
+
+    def encode(self, category, document):
+        # Malformed tags (a non-dict compatibilityTags, nested objects) leave the axis untagged
+        tags = document.get("compatibilityTags")
+        if not isinstance(tags, dict):
+            tags = {}
+        masks = {}
+        for axis, tag in self.category_axes.get(category, {}).items():
+            values = tags.get(tag)
+            if not isinstance(values, list):
+                values = [values]
+            mask = 0
+            vocab = self.vocab[axis]
+            for value in values:
+                if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                    continue
+                for canonical in canonical_values(axis, value):
+                    if canonical not in vocab:
+                        vocab[canonical] = len(vocab)
+                    mask |= 1 << vocab[canonical]
+            if mask:
+                masks[axis] = mask
+        return masks
+
+    def load(self, db):
+        for category in self.indexes:
+            for document in db[category].find({}, {"name": 1, "compatibilityTags": 1}):
+                self.upsert(category, document)
+
+    def upsert(self, category, document):
+        if category not in self.indexes:
+            return
+        with self._lock:
+            masks = self.encode(category, document)
+            self.indexes[category].put(document["_id"], document.get("name"), masks)
+
+    def remove(self, category, part_id):
+        if category not in self.indexes:
+            return
+        with self._lock:
+            self.indexes[category].remove(part_id)
+
+    def _part_masks(self, category, part):
+        if isinstance(part, dict):
+            return self.encode(category, part)
+        index = self.indexes[category]
+        row = index.rows.get(part)
+        if row is None:
+            raise KeyError(f"Unknown {category} part: {part}")
+        return {axis: masks[row] for axis, masks in index.masks.items() if masks[row]}
+
+    def candidates(self, build, categories=None):
+        # build maps a category to a part _id already in the index or to a part document.
+        # Returns every remaining category's parts that agree with all selected parts.
+        with self._lock:
+            selected = [(category, self._part_masks(category, part)) for category, part in build.items()]
+            if categories is None:
+                categories = [category for category in self.indexes if category not in build]
+
+            results = {}
+            for category in categories:
+                index = self.indexes[category]
+                rows = index.live
+                for _, masks in selected:
+                    for axis, mask in masks.items():
+                        if axis in index.masks:
+                            rows &= index.matching(axis, mask)
+                    if not rows:
+                        break
+                results[category] = [{"_id": index.ids[row], "name": index.names[row]} for row in iter_rows(rows)]
+            return results
+
+    def clear(self, category):
+        if category not in self.indexes:
+            return
+        with self._lock:
+            self.indexes[category] = CategoryIndex(self.category_axes[category])
+
+    def apply_change(self, change):
+        operation = change.get("operationType")
+        category = change.get("ns", {}).get("coll")
+        if operation == "delete":
+            self.remove(category, change["documentKey"]["_id"])
+        elif operation in ("insert", "update", "replace") and change.get("fullDocument"):
+            self.upsert(category, change["fullDocument"])
+        elif operation == "drop":
+            self.clear(category)
+
+    def watch(self, db, retry_seconds=5, load=True):
+        # Applies writes from any process as they happen. Change streams need a replica set.
+        # The stream is open before this returns and the initial load runs on the follower
+        # thread before any event is applied, so a write racing the load is replayed on top
+        # of it instead of being overwritten by a stale read. ready is set once loaded.
+        pipeline = [{"$match": {"ns.coll": {"$in": list(self.indexes)}}}]
+        stream = db.watch(pipeline, full_document="updateLookup")
+        self.ready = threading.Event()
+        if not load:
+            self.ready.set()
+
+        def follow(stream):
+            resume_token = stream.resume_token
+            needs_reload = load
+            while True:
+                try:
+                    if stream is None:
+                        # Without a usable resume token, open a fresh stream and rebuild instead
+                        start_after = None if needs_reload else resume_token
+                        stream = db.watch(pipeline, full_document="updateLookup", start_after=start_after)
+                    if needs_reload:
+                        resume_token = stream.resume_token
+                        for category in self.indexes:
+                            self.clear(category)
+                        self.load(db)
+                        needs_reload = False
+                        self.ready.set()
+                    with stream:
+                        for change in stream:
+                            try:
+                                self.apply_change(change)
+                            except Exception as e:
+                                # A bad document must not replay forever; skip past it
+                                print(f"Skipping compatibility change {change.get('documentKey')}: {str(e)}")
+                            resume_token = stream.resume_token
+                    # The stream ends after an invalidate event; start_after picks up behind it
+                except OperationFailure as e:
+                    if e.code == CHANGE_STREAM_HISTORY_LOST:
+                        print("Compatibility change stream fell behind the oplog, reloading parts")
+                        needs_reload = True
+                    else:
+                        print(f"Compatibility change stream interrupted, reconnecting: {str(e)}")
+                        time.sleep(retry_seconds)
+                except Exception as e:
+                    print(f"Compatibility change stream interrupted, reconnecting: {str(e)}")
+                    time.sleep(retry_seconds)
+                stream = None
+
+        thread = threading.Thread(target=follow, args=(stream,), daemon=True)
+        thread.start()
+        return thread
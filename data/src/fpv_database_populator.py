@@ -3,12 +3,15 @@ import json
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, 
                              QLineEdit, QPushButton, QTextEdit, QMessageBox, QScrollArea, QCheckBox, QDialog, QDialogButtonBox,
-                             QProgressBar, QTabWidget)
-from PyQt6.QtCore import Qt, QTimer, QRunnable, QThreadPool, pyqtSignal, QObject
-import requests
+                             QProgressBar, QTabWidget, QCompleter)
+from PyQt6.QtCore import Qt, QTimer, QRunnable, QThreadPool, pyqtSignal, QObject, QStringListModel
 from pymongo import MongoClient
 from dotenv import load_dotenv
 import pickle
+import copy
+import threading
+from pipeline import COMPATIBILITY_DATA, Cancelled, process_product_info
+from catalog_index import ProductNameIndex
 
 # Load environment variables
 load_dotenv()
@@ -18,40 +21,6 @@ MONGO_URI = os.getenv("MONGO_URI")
 client = MongoClient(MONGO_URI)
 db = client.droneFPVPartPicker
 
-def query_perplexity(prompt, model="llama-3.1-sonar-huge-128k-online", max_tokens=4000):
-    API_URL = "https://api.perplexity.ai/chat/completions"
-    API_KEY = os.getenv("PERPLEXITY_API_KEY")
-    
-    if not API_KEY:
-        raise ValueError("PERPLEXITY_API_KEY not found in environment variables")
-
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": "You are a specialized web scraping assistant for FPV drone parts. You are meticulous and precise, all the information you provide must be verified and validated. You are not allowed to make up any information. If you are unsure of something, try to find the most accurate answer."},
-            {"role": "user", "content": prompt}
-        ],
-        "max_tokens": max_tokens
-    }
-    
-    try:
-        response = requests.post(API_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        content = response.json()['choices'][0]['message']['content']
-        
-        # Remove ```json and ``` from the response
-        content = content.replace("```json", "").replace("```", "").strip()
-        
-        return content
-    except requests.exceptions.RequestException as e:
-        print(f"Error communicating with Perplexity API: {str(e)}")
-        return None
-
 def send_to_mongodb(data, category):
     collection = db[category]
     result = collection.insert_one(data)
@@ -64,26 +33,41 @@ class Worker(QRunnable):
         finished = pyqtSignal()
         error = pyqtSignal(str)
 
-    def __init__(self, fn, *args, **kwargs):
+    def __init__(self, fn, *args, cancellable=False, **kwargs):
         super().__init__()
         self.fn = fn
         self.args = args
         self.kwargs = kwargs
         self.signals = Worker.Signals()
+        self.cancelled = threading.Event()
+        self.done = False  # Set once run() has returned
+        if cancellable:
+            self.kwargs["cancelled"] = self.cancelled  # fn checks this to stop early
+
+    def cancel(self):
+        self.cancelled.set()
 
     def run(self):
         try:
             result = self.fn(*self.args, **self.kwargs)
+        except Cancelled:
+            return
         except Exception as e:
-            self.signals.error.emit(str(e))
+            if not self.cancelled.is_set():
+                self.signals.error.emit(str(e))
         else:
-            self.signals.result.emit(result)
+            if not self.cancelled.is_set():
+                self.signals.result.emit(result)
         finally:
-            self.signals.finished.emit()
+            # A cancelled worker was already finished by its caller
+            if not self.cancelled.is_set():
+                self.signals.finished.emit()
+            self.done = True
 
 class ProductTab(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, product_index=None):
         super().__init__(parent)
+        self.product_index = product_index if product_index is not None else ProductNameIndex()
         self.layout = QVBoxLayout(self)
         
         # Category selection
@@ -132,113 +116,7 @@ class ProductTab(QWidget):
         compatibility_widget.setLayout(compatibility_layout)
 
         self.compatibility_checkboxes = {}
-        self.compatibility_data = {
-            "frames": {
-                "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
-                "Size": ["1.5 inch", "2 inch", "2.5inch", "3 inch", "3.5 inch", "4 inch", "5 inch", "7 inch", "10 inch"],
-                "Motor Mount": ["3-M1.4-φ6.6mm","3-16x19mm","3-25x25mm","4-M2-12x12mm", "4-16x16mm", "4-19x19mm", "4-25x25mm", "4-30x30mm", "4-40x40mm"],
-                "Stack Mount": ["20x20mm", "25.5x25.5mm", "30.5x30.5mm", "36x36mm"],
-                "Max Prop Size": ["1.5 inch", "1.77 inch", "2 inch", "2.5 inch", "3 inch", "3.5 inch", "5 inch", "7 inch", "10 inch"],
-                "VTX Mount": ["20x20mm", "25.5x25.5mm"],
-                "Camera Size": ["14mm", "19mm", "21mm","28mm"],
-                "Battery Mount": ["20x20mm", "30x30mm", "40x40mm"],
-                "Arm Thickness": ["4mm", "5mm", "6mm", "8mm"],
-                "Weight Class": ["Lightweight", "Medium", "Heavy"],
-                "Material": ["Carbon Fiber", "Plastic", "Aluminum"]
-            },
-            "propellers": {
-                "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
-                "Diameter": ["1.77 inch", "2 inch", "3 inch", "3.5 inch", "4 inch", "5 inch", "6 inch", "7 inch"],
-                "Pitch": ["1.5 inch", "2 inch", "3 inch", "4 inch", "5 inch", "6 inch"],
-                "Bore": ["1mm", "1.5mm", "3mm", "5mm", "6mm"],
-                "Rotation": ["CW", "CCW"],
-                "Blade Count": ["2-blade", "3-blade", "4-blade", "5-blade"],
-                "Mounting Type": ["Press Fit", "Threaded", "T-Mount"]
-            },
-            "motors": {
-                "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
-                "Stator Size": ["0702","1103", "1204", "1306", "1408", "1506", "2205", "2206", "2207", "2306", "2307", "2405", "2506", "2507", "2508"],
-                "Shaft Diameter": ["1.0mm","1.5mm", "2mm", "3mm", "4mm", "5mm"],
-                "Mounting Pattern": ["3-M1.4-φ6.6mm","3-16x19mm","3-25x25mm","4-M2-12x12mm", "4-M3-16x16mm", "4-19x19mm", "4-25x25mm", "4-30x30mm", "4-40x40mm"],
-                "KV Rating": ["1300KV", "1700KV", "1800KV", "2300KV", "2600KV", "1960KV", "3000KV", "4000KV", "22000KV", "23000KV", "25000KV", "26000KV", "28000KV", "30000KV", "46000KV"],
-                "Prop Mounting Type": ["Press Fit", "Threaded", "T-Mount"],
-                "Prop Compatibility": ["1.23", "3 inch", "4 inch", "5 inch", "6 inch", "7 inch"],
-                "Voltage": ["1S","2S", "3S", "4S", "5S", "6S"]
-            },
-            "batteries": {
-                "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
-                "Voltage": ["1S", "2S", "3S", "4S", "5S", "6S"],
-                "Capacity": ["300mAh", "450mAh", "650mAh", "850mAh", "1000mAh", "1300mAh", "1500mAh", "2200mAh"],
-                "Discharge Rate": ["25C", "50C", "75C", "100C", "150C"],
-                "Connector": ["XT30", "XT60", "XT90", "PH2.0", "BT2.0", "JST"],
-                "Form Factor": ["Standard", "Long", "Square", "Flat"]
-            },
-            "flightcontrollers": {
-                "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
-                "Size": ["16x16mm", "20x20mm", "25.5x25.5mm", "30.5x30.5mm", "36x36mm"],
-                "Processor": ["F4", "F7", "H7"],
-                "Voltage": ["1S", "2S", "3S", "4S", "5S", "6S"],
-                "Gyro": ["MPU6000", "ICM20602", "BMI270"],
-                "UART Count": ["4", "6", "8", "10+"],
-                "Firmware": ["Betaflight", "INAV", "Ardupilot", "KISS"],
-                "Motor Protocol": ["DShot300", "DShot600", "DShot1200", "Oneshot", "Multishot", "Serial"],
-                "Receiver Protocol": ["FrSky", "Spektrum", "FlySky", "Crossfire", "ExpressLRS"],
-                "Features": ["Stack", "PDB", "ESC", "OSD", "VTX", "SD Card", "Telemetry"]
-            },
-            "escs": {
-                "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
-                "Size": ["16x16mm", "20x20mm", "25.5x25.5mm", "30.5x30.5mm", "36x36mm"],
-                "Current Rating": ["20A", "30A", "40A", "50A", "60A", "70A", "80A", "90A", "100A"],
-                "Voltage": ["2-4S", "3-6S", "2-8S"],
-                "Battery Connector": ["XT30", "XT60", "XT90", "PH2.0", "BT2.0", "JST"],
-                "Firmware": ["BLHeli_S", "BLHeli_32", "KISS"],
-                "Protocol": ["DShot300", "DShot600", "DShot1200", "Multishot", "Oneshot125"]
-            },
-            "videotransmitters": {
-                "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
-                "Frequency": ["5.8GHz", "2.4GHz", "1.3GHz"],
-                "Resolution": ["720p", "1080p", "4K"],
-                "Refresh Rate": ["30fps", "60fps", "120fps"],
-                "Latency": ["10ms", "20ms", "30ms", "40ms", "50ms"],
-                "Range": ["100m", "200m", "300m", "400m", "500m"],
-                "Power Output": ["25mW", "200mW", "500mW", "800mW", "1W", "2W"],
-                "Video Format": ["Analog", "DJI HD", "HDZero", "Walksnail Avatar"],
-                "SD Card": ["Yes", "No"],
-                "Mount Size": ["20x20mm", "25.5x25.5mm", "30.5x30.5mm", "36x36mm"],
-                "Voltage": ["3.3V", "5V", "5-36V"],
-                "Antenna Connector": ["UFL", "MMCX", "SMA"],
-                "Smart Audio": ["Yes", "No"]
-            },
-            "vtxantenna": {
-                "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
-                "Frequency": ["5.8GHz", "2.4GHz", "1.3GHz"],
-                "Range": ["100m", "200m", "300m", "400m", "500m"],
-                "Power Output": ["25mW", "200mW", "500mW", "800mW", "1W", "2W"],
-                "Polarization": ["Linear", "Circular (LHCP)", "Circular (RHCP)"],
-                "Environment": ["Indoor", "Outdoor"],
-                "Antenna Connector": ["UFL", "MMCX", "SMA", "I-PEX"],
-                "Smart Audio": ["Yes", "No"]
-            },
-            "fpvcameras": {
-                "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
-                "Sensor Size": ["1/3 inch", "1/2.7 inch", "1/2 inch", "1/1.8 inch"],
-                "Size": ["14mm", "19mm", "21mm", "28mm"],
-                "Resolution": ["700TVL", "1000TVL", "1200TVL", "1800TVL"],
-                "Lens": ["1.8mm", "2.1mm", "2.5mm"],
-                "FOV": ["120°", "135°", "150°", "170°"],
-                "Voltage": ["3.3V", "5V", "5-36V"]
-            },
-            "receivers": {
-                "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
-                "Protocol": ["FrSky", "Spektrum", "FlySky", "Crossfire", "ExpressLRS"],
-                "Telemetry": ["Yes", "No"],
-                "Antenna Type": ["Dipole", "Diversity", "Ceramic", "Cloverleaf"],
-                "Voltage": ["3.3V", "5V"],
-                "Polarization": ["Linear", "Circular (LHCP)", "Circular (RHCP)"],
-                "Environment": ["Indoor", "Outdoor"],
-                "Antenna Connector": ["SMA", "RP-SMA", "U.FL", "MMCX"]
-            }
-        }
+        self.compatibility_data = copy.deepcopy(COMPATIBILITY_DATA)
 
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
@@ -288,12 +166,41 @@ class ProductTab(QWidget):
         self.layout.addLayout(model_layout)
 
         self.threadpool = QThreadPool()
+        self.current_worker = None
 
         self.cancel_button = QPushButton("Cancel")
         self.cancel_button.clicked.connect(self.cancel_operation)
         self.cancel_button.hide()
         self.layout.addWidget(self.cancel_button)
 
+        # Autocomplete product names from the catalog and cache
+        self.completer_model = QStringListModel()
+        self.completer = QCompleter(self.completer_model, self)
+        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.product_input.setCompleter(self.completer)
+
+        self.autocomplete_timer = QTimer(self)
+        self.autocomplete_timer.setSingleShot(True)
+        self.autocomplete_timer.setInterval(200)
+        self.autocomplete_timer.timeout.connect(self.update_completions)
+
+        # Speculatively fetch the product once the typed name stops changing
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.timeout.connect(self.start_prefetch)
+        self.prefetch_worker = None
+        self.prefetch_key = None
+        self.retired_prefetches = []  # Cancelled or finished prefetches whose run() may not have returned
+        self.prefetched = None  # (lookup key, result) of the last completed prefetch
+
+        # textEdited, not textChanged: browsing the completer popup also sets the text
+        self.product_input.textEdited.connect(self.on_lookup_changed)
+        self.completer.activated.connect(self.on_completion_activated)
+        self.category_combo.currentTextChanged.connect(self.on_lookup_changed)
+        self.retrieval_model_combo.currentTextChanged.connect(self.on_lookup_changed)
+        self.validation_model_combo.currentTextChanged.connect(self.on_lookup_changed)
+
         # Add new right-hand side layout for Image URL and Links
         right_side_layout = QVBoxLayout()
         
@@ -348,70 +255,119 @@ class ProductTab(QWidget):
             print(f"Error updating compatibility checkboxes: {str(e)}")
             QMessageBox.warning(self, "Warning", f"Error updating compatibility checkboxes: {str(e)}")
 
-    def get_product_info(self, category, product_name):
-        # cache_file = os.path.join(self.cache_dir, f"{category}_{product_name.replace(' ', '_')}.pkl")
-        
-        # if os.path.exists(cache_file):
-        #     with open(cache_file, 'rb') as f:
-        #         return pickle.load(f)
-
-        with open('data/src/prompts.md', 'r') as file:
-            prompt_template = file.read()
-
-        compatibility_tags = self.compatibility_data[category]
-        
-        # Create the compatibility tags string
-        compatibility_tags_str = "\n".join([f"   - {tag}: {options}" for tag, options in compatibility_tags.items()])
-        
-        # Create the compatibility JSON structure
-        compatibility_json_str = "\n".join([f'    "{tag}": ["string" or null],' for tag in compatibility_tags.keys()])
-        compatibility_json_str = compatibility_json_str.rstrip(',')  # Remove the last comma
+    def lookup_key(self):
+        return (self.category_combo.currentText(), self.product_input.text().strip(),
+                self.retrieval_model_combo.currentText(), self.validation_model_combo.currentText())
+
+    def on_lookup_changed(self):
+        self.cancel_prefetch()
+        self.autocomplete_timer.start()
+        self.schedule_prefetch()
+
+    def on_completion_activated(self, text):
+        # A picked catalog name is as stable as it gets; prefetch once the line edit holds it
+        self.cancel_prefetch()
+        self.prefetch_timer.start(0)
+
+    def prefetch_delay(self):
+        # A prefetch cannot abort its HTTP request once sent, so only spend it on likely lookups:
+        # a known catalog name, or a long name left untouched for a while
+        category, product_name = self.lookup_key()[:2]
+        if self.product_index.contains(category, product_name):
+            return 1000
+        if len(product_name) >= 16:
+            return 3000
+        return None
 
-        # Replace placeholders in the template
-        full_prompt = prompt_template.replace("{CATEGORY}", category)
-        full_prompt = full_prompt.replace("{COMPATIBILITY_TAGS}", compatibility_tags_str)
-        full_prompt = full_prompt.replace("{COMPATIBILITY_JSON}", compatibility_json_str)
+    def schedule_prefetch(self):
+        delay = self.prefetch_delay()
+        if delay is not None:
+            self.prefetch_timer.start(delay)
+
+    def update_completions(self):
+        text = self.product_input.text()
+        names = self.product_index.complete(self.category_combo.currentText(), text) if len(text.strip()) >= 2 else []
+        self.completer_model.setStringList(names)
+        if names and names != [text] and self.product_input.hasFocus():
+            self.completer.complete()
+
+    def start_prefetch(self):
+        key = self.lookup_key()
+        category, product_name = key[0], key[1]
+        if self.prefetch_delay() is None or self.current_worker is not None:
+            return
+        if self.prefetched is not None and self.prefetched[0] == key:
+            return
 
-        full_prompt += f"\n\nProduct title: {product_name}\n\nPlease provide the response in valid JSON format."
-        
-        response = query_perplexity(full_prompt, model=self.retrieval_model_combo.currentText())
-        
-        try:
-            result = json.loads(response)
-            # with open(cache_file, 'wb') as f:
-            #     pickle.dump(result, f)
-            return result
-        except json.JSONDecodeError:
-            return response  # Return the raw response if not valid JSON
+        # Models are read here on the GUI thread and passed along, never from the worker
+        worker = Worker(self.process_product_info, *key, cancellable=True)
+        worker.setAutoDelete(False)  # Kept alive so cancel_prefetch can still reach it
+        worker.signals.result.connect(lambda result, key=key: self.handle_prefetch_result(key, result))
+        worker.signals.error.connect(lambda error: print(f"Speculative lookup failed: {error}"))
+
+        self.prefetch_worker = worker
+        self.prefetch_key = key
+        self.threadpool.start(worker, -1)  # Below user-initiated work
+
+    def cancel_prefetch(self):
+        self.prefetch_timer.stop()
+        if self.prefetch_worker is not None:
+            # Still queued: drop it outright. Already running: the request in flight cannot be
+            # aborted, so stop listening and skip validation.
+            self.prefetch_worker.cancel()
+            if self.threadpool.tryTake(self.prefetch_worker):
+                self.prefetch_worker = None
+        self.retire_prefetch()
+
+    def retire_prefetch(self):
+        # With autoDelete off the pool does not own the worker, so a started one must stay
+        # referenced until its run() returns
+        if self.prefetch_worker is not None:
+            self.retired_prefetches.append(self.prefetch_worker)
+        self.prefetch_worker = None
+        self.prefetch_key = None
+        self.retired_prefetches = [worker for worker in self.retired_prefetches if not worker.done]
+
+    def handle_prefetch_result(self, key, result):
+        # Cancelled workers emit nothing, so a matching key is the current prefetch
+        if self.prefetch_key == key:
+            self.retire_prefetch()
+        if isinstance(result, dict):
+            self.prefetched = (key, result)
 
     def get_info(self):
-        category = self.category_combo.currentText()
-        product_name = self.product_input.text()
+        key = self.lookup_key()
+        category, product_name = key[0], key[1]
 
         if not category or not product_name:
             QMessageBox.critical(self, "Error", "Please enter both category and product name")
             return
 
+        self.prefetch_timer.stop()
+        if self.prefetched is not None and self.prefetched[0] == key:
+            result = self.prefetched[1]
+            self.prefetched = None
+            self.handle_result(result)
+            return
+        # A prefetch still in flight is shared through inflight_queries rather than restarted
+
         self.progress_bar.show()
         self.progress_bar.setValue(0)
 
-        worker = Worker(self.process_product_info, category, product_name)
+        worker = Worker(self.process_product_info, *key, cancellable=True)
         worker.signals.result.connect(self.handle_result)
         worker.signals.finished.connect(self.handle_finished)
         worker.signals.error.connect(self.handle_error)
 
+        self.current_worker = worker
         self.threadpool.start(worker)
 
         self.get_info_button.setEnabled(False)
         self.cancel_button.show()
 
-    def process_product_info(self, category, product_name):
-        product_info = self.get_product_info(category, product_name)
-        if isinstance(product_info, dict):
-            validated_info = self.validate_product_info(category, product_info)
-            return validated_info
-        else:
-            return product_info
+    def process_product_info(self, category, product_name, retrieval_model, validation_model, cancelled=None):
+        return process_product_info(category, product_name, self.compatibility_data[category],
+                                    retrieval_model, validation_model, cancelled)
 
     def handle_result(self, result):
         if isinstance(result, dict):
@@ -425,6 +381,7 @@ class ProductTab(QWidget):
             QMessageBox.warning(self, "Warning", "Received unexpected response from Perplexity API. Check the JSON output for details.")
 
     def handle_finished(self):
+        self.current_worker = None
         self.progress_bar.setValue(100)
         QTimer.singleShot(1000, self.progress_bar.hide)
         self.get_info_button.setEnabled(True)
@@ -434,32 +391,6 @@ class ProductTab(QWidget):
         QMessageBox.critical(self, "Error", f"An error occurred: {error}")
         self.progress_bar.hide()
 
-    def validate_product_info(self, category, product_info):
-        validation_prompt = f"""
-        You are a specialized FPV drone part data validator. Please review and correct the following JSON data for a {category} product:
-
-        {json.dumps(product_info, indent=2)}
-
-        Please focus on the following tasks:
-        1. Ensure all compatibility tags are correct and relevant for the {category} category. 
-        2. Verify that the links are valid, if there are only a few links, check them manually or add more links that are accurate. 
-        3. Check that the prices are precise and accurate. They should be in the correct format (float).
-        4. Make sure the specifications are relevant and accurate for a {category} product. Only include specifications that are not already mentioned in the compatibility tags.
-
-        If you find any issues or have any corrections, please provide the full corrected JSON data. If everything is correct, simply return the original JSON data.
-
-        Your response should be a valid JSON object and nothing else.
-        """
-
-        validated_response = query_perplexity(validation_prompt, model=self.validation_model_combo.currentText())
-        
-        try:
-            validated_info = json.loads(validated_response)
-            return validated_info
-        except json.JSONDecodeError:
-            print(f"Error decoding validated JSON: {validated_response}")
-            return product_info  # Return original data if validation fails
-
     def refresh_compatibility(self):
         try:
             data = json.loads(self.json_text.toPlainText())
@@ -524,6 +455,8 @@ class ProductTab(QWidget):
             
             category = self.category_combo.currentText()
             inserted_id = send_to_mongodb(data, category)
+            self.product_index.add(category, data.get("name"))
+            self.product_index.add(category, self.product_input.text())
             QMessageBox.information(self, "Success", f"Data sent to MongoDB. Category: {category}, Inserted ID: {inserted_id}")
         except json.JSONDecodeError:
             QMessageBox.critical(self, "Error", "Invalid JSON data")
@@ -550,6 +483,10 @@ class ProductTab(QWidget):
                 QMessageBox.warning(self, "Warning", "Both subcategory and new entry must be provided")
 
     def cancel_operation(self):
+        # Only this tab stops listening; a request shared with other tabs keeps running for them
+        if self.current_worker is not None:
+            self.current_worker.cancel()
+            self.current_worker = None
         self.threadpool.clear()
         self.handle_finished()
 
@@ -619,6 +556,12 @@ class MainWindow(QMainWindow):
 
         self.layout = QVBoxLayout(self.central_widget)
 
+        # Product names shared by every tab for autocomplete
+        self.product_index = ProductNameIndex()
+        loader = Worker(self.product_index.load, db, "data/cache", list(COMPATIBILITY_DATA))
+        loader.signals.error.connect(lambda error: print(f"Error loading product names: {error}"))
+        QThreadPool.globalInstance().start(loader)
+
         # Create tab widget
         self.tab_widget = QTabWidget()
         self.layout.addWidget(self.tab_widget)
@@ -637,7 +580,7 @@ class MainWindow(QMainWindow):
         self.layout.addWidget(self.send_to_db_button)
 
     def add_new_tab(self):
-        new_tab = ProductTab(self)
+        new_tab = ProductTab(self, product_index=self.product_index)
         tab_index = self.tab_widget.addTab(new_tab, f"Product {self.tab_widget.count() + 1}")
         self.tab_widget.setCurrentIndex(tab_index)
 
@@ -0,0 +1,166 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+class JobQueue:
+    # Leased queue of (category, product_name) tasks stored in a Mongo collection.
+    # A worker owns a job only while its lease is unexpired; expired leases are
+    # picked up again by the next claim, so a crashed worker never loses a part.
+    def __init__(self, collection, lease_seconds=120, max_attempts=3):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.collection.create_index([("category", ASCENDING), ("product_name", ASCENDING)], unique=True)
+        # Pending jobs are claimed in enqueue order: equality on status, sort on created_at,
+        # and the attempts filter answered from the index keys
+        self.collection.create_index([("status", ASCENDING), ("created_at", ASCENDING), ("attempts", ASCENDING)])
+        self.collection.create_index([("status", ASCENDING), ("lease_expires", ASCENDING)])
+
+    def enqueue(self, category, product_name):
+        try:
+            result = self.collection.update_one(
+                {"category": category, "product_name": product_name},
+                {"$setOnInsert": {
+                    "status": PENDING,
+                    "owner": None,
+                    "lease_expires": None,
+                    "attempts": 0,
+                    "error": None,
+                    "created_at": utcnow()
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False  # Another process enqueued the same part concurrently
+        return result.upserted_id is not None
+
+    def claim(self, owner):
+        # Expired leases first so a crashed worker's part is not pushed to the end of the run.
+        # Each query has its own index, which a single $or with a sort could not use.
+        now = utcnow()
+        update = {
+            "$set": {"status": LEASED, "owner": owner, "lease_expires": now + timedelta(seconds=self.lease_seconds)},
+            "$inc": {"attempts": 1}
+        }
+        job = self.collection.find_one_and_update(
+            {"status": LEASED, "lease_expires": {"$lt": now}, "attempts": {"$lt": self.max_attempts}},
+            update,
+            sort=[("lease_expires", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        if job is not None:
+            return job
+        return self.collection.find_one_and_update(
+            {"status": PENDING, "attempts": {"$lt": self.max_attempts}},
+            update,
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def heartbeat(self, job, owner):
+        result = self.collection.update_one(
+            {"_id": job["_id"], "owner": owner, "status": LEASED},
+            {"$set": {"lease_expires": utcnow() + timedelta(seconds=self.lease_seconds)}}
+        )
+        return result.matched_count == 1
+
+    def complete(self, job, owner, data, target_db):
+        if not self.heartbeat(job, owner):
+            return False  # Lease lost, the job belongs to another worker now
+
+        # The part document reuses the job id, so a re-run after an expired lease
+        # replaces the earlier write instead of inserting a duplicate.
+        document = dict(data)
+        document["_id"] = job["_id"]
+        target_db[job["category"]].replace_one({"_id": job["_id"]}, document, upsert=True)
+
+        result = self.collection.update_one(
+            {"_id": job["_id"], "owner": owner, "status": LEASED},
+            {"$set": {"status": DONE, "lease_expires": None, "error": None, "completed_at": utcnow()}}
+        )
+        return result.matched_count == 1
+
+    def fail(self, job, owner, error):
+        status = FAILED if job["attempts"] >= self.max_attempts else PENDING
+        result = self.collection.update_one(
+            {"_id": job["_id"], "owner": owner, "status": LEASED},
+            {"$set": {"status": status, "owner": None, "lease_expires": None, "error": error}}
+        )
+        return result.matched_count == 1
+
+    def reap_expired(self):
+        # Jobs that have used up their attempts are never claimed again. This includes
+        # pending jobs left over from a run with a higher max_attempts.
+        result = self.collection.update_many(
+            {
+                "attempts": {"$gte": self.max_attempts},
+                "$or": [
+                    {"status": PENDING},
+                    {"status": LEASED, "lease_expires": {"$lt": utcnow()}}
+                ]
+            },
+            {"$set": {"status": FAILED, "owner": None, "lease_expires": None}}
+        )
+        return result.modified_count
+
+    def retry_failed(self, category=None):
+        query = {"status": FAILED}
+        if category:
+            query["category"] = category
+        result = self.collection.update_many(
+            query,
+            {"$set": {"status": PENDING, "owner": None, "lease_expires": None, "attempts": 0, "error": None}}
+        )
+        return result.modified_count
+
+    def has_unfinished(self):
+        return self.collection.count_documents({
+            "$or": [
+                {"status": PENDING, "attempts": {"$lt": self.max_attempts}},
+                {"status": LEASED}
+            ]
+        }, limit=1) > 0
+
+    def counts(self):
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+class Heartbeat:
+    # Renews a job lease from a background thread while the pipeline runs
+    def __init__(self, queue, job, owner, interval=None):
+        self.queue = queue
+        self.job = job
+        self.owner = owner
+        self.interval = interval or max(queue.lease_seconds / 3, 1)
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.job, self.owner):
+                    self.lost = True
+                    return
+            except Exception as e:
+                print(f"Heartbeat failed for job {self.job['_id']}: {str(e)}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,226 @@
+import os
+import json
+import requests
+from dotenv import load_dotenv
+from singleflight import SingleFlight, Cancelled
+
+# Load environment variables
+load_dotenv()
+
+COMPATIBILITY_DATA = {
+    "frames": {
+        "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
+        "Size": ["1.5 inch", "2 inch", "2.5inch", "3 inch", "3.5 inch", "4 inch", "5 inch", "7 inch", "10 inch"],
+        "Motor Mount": ["3-M1.4-φ6.6mm","3-16x19mm","3-25x25mm","4-M2-12x12mm", "4-16x16mm", "4-19x19mm", "4-25x25mm", "4-30x30mm", "4-40x40mm"],
+        "Stack Mount": ["20x20mm", "25.5x25.5mm", "30.5x30.5mm", "36x36mm"],
+        "Max Prop Size": ["1.5 inch", "1.77 inch", "2 inch", "2.5 inch", "3 inch", "3.5 inch", "5 inch", "7 inch", "10 inch"],
+        "VTX Mount": ["20x20mm", "25.5x25.5mm"],
+        "Camera Size": ["14mm", "19mm", "21mm","28mm"],
+        "Battery Mount": ["20x20mm", "30x30mm", "40x40mm"],
+        "Arm Thickness": ["4mm", "5mm", "6mm", "8mm"],
+        "Weight Class": ["Lightweight", "Medium", "Heavy"],
+        "Material": ["Carbon Fiber", "Plastic", "Aluminum"]
+    },
+    "propellers": {
+        "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
+        "Diameter": ["1.77 inch", "2 inch", "3 inch", "3.5 inch", "4 inch", "5 inch", "6 inch", "7 inch"],
+        "Pitch": ["1.5 inch", "2 inch", "3 inch", "4 inch", "5 inch", "6 inch"],
+        "Bore": ["1mm", "1.5mm", "3mm", "5mm", "6mm"],
+        "Rotation": ["CW", "CCW"],
+        "Blade Count": ["2-blade", "3-blade", "4-blade", "5-blade"],
+        "Mounting Type": ["Press Fit", "Threaded", "T-Mount"]
+    },
+    "motors": {
+        "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
+        "Stator Size": ["0702","1103", "1204", "1306", "1408", "1506", "2205", "2206", "2207", "2306", "2307", "2405", "2506", "2507", "2508"],
+        "Shaft Diameter": ["1.0mm","1.5mm", "2mm", "3mm", "4mm", "5mm"],
+        "Mounting Pattern": ["3-M1.4-φ6.6mm","3-16x19mm","3-25x25mm","4-M2-12x12mm", "4-M3-16x16mm", "4-19x19mm", "4-25x25mm", "4-30x30mm", "4-40x40mm"],
+        "KV Rating": ["1300KV", "1700KV", "1800KV", "2300KV", "2600KV", "1960KV", "3000KV", "4000KV", "22000KV", "23000KV", "25000KV", "26000KV", "28000KV", "30000KV", "46000KV"],
+        "Prop Mounting Type": ["Press Fit", "Threaded", "T-Mount"],
+        "Prop Compatibility": ["1.23", "3 inch", "4 inch", "5 inch", "6 inch", "7 inch"],
+        "Voltage": ["1S","2S", "3S", "4S", "5S", "6S"]
+    },
+    "batteries": {
+        "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
+        "Voltage": ["1S", "2S", "3S", "4S", "5S", "6S"],
+        "Capacity": ["300mAh", "450mAh", "650mAh", "850mAh", "1000mAh", "1300mAh", "1500mAh", "2200mAh"],
+        "Discharge Rate": ["25C", "50C", "75C", "100C", "150C"],
+        "Connector": ["XT30", "XT60", "XT90", "PH2.0", "BT2.0", "JST"],
+        "Form Factor": ["Standard", "Long", "Square", "Flat"]
+    },
+    "flightcontrollers": {
+        "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
+        "Size": ["16x16mm", "20x20mm", "25.5x25.5mm", "30.5x30.5mm", "36x36mm"],
+        "Processor": ["F4", "F7", "H7"],
+        "Voltage": ["1S", "2S", "3S", "4S", "5S", "6S"],
+        "Gyro": ["MPU6000", "ICM20602", "BMI270"],
+        "UART Count": ["4", "6", "8", "10+"],
+        "Firmware": ["Betaflight", "INAV", "Ardupilot", "KISS"],
+        "Motor Protocol": ["DShot300", "DShot600", "DShot1200", "Oneshot", "Multishot", "Serial"],
+        "Receiver Protocol": ["FrSky", "Spektrum", "FlySky", "Crossfire", "ExpressLRS"],
+        "Features": ["Stack", "PDB", "ESC", "OSD", "VTX", "SD Card", "Telemetry"]
+    },
+    "escs": {
+        "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
+        "Size": ["16x16mm", "20x20mm", "25.5x25.5mm", "30.5x30.5mm", "36x36mm"],
+        "Current Rating": ["20A", "30A", "40A", "50A", "60A", "70A", "80A", "90A", "100A"],
+        "Voltage": ["2-4S", "3-6S", "2-8S"],
+        "Battery Connector": ["XT30", "XT60", "XT90", "PH2.0", "BT2.0", "JST"],
+        "Firmware": ["BLHeli_S", "BLHeli_32", "KISS"],
+        "Protocol": ["DShot300", "DShot600", "DShot1200", "Multishot", "Oneshot125"]
+    },
+    "videotransmitters": {
+        "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
+        "Frequency": ["5.8GHz", "2.4GHz", "1.3GHz"],
+        "Resolution": ["720p", "1080p", "4K"],
+        "Refresh Rate": ["30fps", "60fps", "120fps"],
+        "Latency": ["10ms", "20ms", "30ms", "40ms", "50ms"],
+        "Range": ["100m", "200m", "300m", "400m", "500m"],
+        "Power Output": ["25mW", "200mW", "500mW", "800mW", "1W", "2W"],
+        "Video Format": ["Analog", "DJI HD", "HDZero", "Walksnail Avatar"],
+        "SD Card": ["Yes", "No"],
+        "Mount Size": ["20x20mm", "25.5x25.5mm", "30.5x30.5mm", "36x36mm"],
+        "Voltage": ["3.3V", "5V", "5-36V"],
+        "Antenna Connector": ["UFL", "MMCX", "SMA"],
+        "Smart Audio": ["Yes", "No"]
+    },
+    "vtxantenna": {
+        "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
+        "Frequency": ["5.8GHz", "2.4GHz", "1.3GHz"],
+        "Range": ["100m", "200m", "300m", "400m", "500m"],
+        "Power Output": ["25mW", "200mW", "500mW", "800mW", "1W", "2W"],
+        "Polarization": ["Linear", "Circular (LHCP)", "Circular (RHCP)"],
+        "Environment": ["Indoor", "Outdoor"],
+        "Antenna Connector": ["UFL", "MMCX", "SMA", "I-PEX"],
+        "Smart Audio": ["Yes", "No"]
+    },
+    "fpvcameras": {
+        "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
+        "Sensor Size": ["1/3 inch", "1/2.7 inch", "1/2 inch", "1/1.8 inch"],
+        "Size": ["14mm", "19mm", "21mm", "28mm"],
+        "Resolution": ["700TVL", "1000TVL", "1200TVL", "1800TVL"],
+        "Lens": ["1.8mm", "2.1mm", "2.5mm"],
+        "FOV": ["120°", "135°", "150°", "170°"],
+        "Voltage": ["3.3V", "5V", "5-36V"]
+    },
+    "receivers": {
+        "Drone Type": ["Cinewhoop", "Freestyle", "Racing", "Long Range", "Micro/Toothpick", "Tiny Whoop"],
+        "Protocol": ["FrSky", "Spektrum", "FlySky", "Crossfire", "ExpressLRS"],
+        "Telemetry": ["Yes", "No"],
+        "Antenna Type": ["Dipole", "Diversity", "Ceramic", "Cloverleaf"],
+        "Voltage": ["3.3V", "5V"],
+        "Polarization": ["Linear", "Circular (LHCP)", "Circular (RHCP)"],
+        "Environment": ["Indoor", "Outdoor"],
+        "Antenna Connector": ["SMA", "RP-SMA", "U.FL", "MMCX"]
+    }
+}
+
+def query_perplexity(prompt, model="llama-3.1-sonar-huge-128k-online", max_tokens=4000, timeout=(10, 300)):
+    API_URL = "https://api.perplexity.ai/chat/completions"
+    API_KEY = os.getenv("PERPLEXITY_API_KEY")
+    
+    if not API_KEY:
+        raise ValueError("PERPLEXITY_API_KEY not found in environment variables")
+
+    headers = {
+        "Authorization": f"Bearer {API_KEY}",
+        "Content-Type": "application/json"
+    }
+    
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": "You are a specialized web scraping assistant for FPV drone parts. You are meticulous and precise, all the information you provide must be verified and validated. You are not allowed to make up any information. If you are unsure of something, try to find the most accurate answer."},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": max_tokens
+    }
+    
+    try:
+        # Bounded so a hung request cannot stall every caller sharing it through inflight_queries
+        response = requests.post(API_URL, headers=headers, json=payload, timeout=timeout)
+        response.raise_for_status()
+        content = response.json()['choices'][0]['message']['content']
+        
+        # Remove ```json and ``` from the response
+        content = content.replace("```json", "").replace("```", "").strip()
+        
+        return content
+    except requests.exceptions.RequestException as e:
+        print(f"Error communicating with Perplexity API: {str(e)}")
+        return None
+
+# Identical prompts sent to the same model share one in-flight request
+inflight_queries = SingleFlight()
+
+def query_perplexity_shared(prompt, model="llama-3.1-sonar-huge-128k-online", cancelled=None):
+    return inflight_queries.do((prompt, model), lambda: query_perplexity(prompt, model=model), cancelled=cancelled)
+
+def get_product_info(category, product_name, compatibility_tags, model, cancelled=None):
+    # cache_file = os.path.join("data/cache", f"{category}_{product_name.replace(' ', '_')}.pkl")
+    
+    # if os.path.exists(cache_file):
+    #     with open(cache_file, 'rb') as f:
+    #         return pickle.load(f)
+
+    with open('data/src/prompts.md', 'r') as file:
+        prompt_template = file.read()
+
+    # Create the compatibility tags string
+    compatibility_tags_str = "\n".join([f"   - {tag}: {options}" for tag, options in compatibility_tags.items()])
+    
+    # Create the compatibility JSON structure
+    compatibility_json_str = "\n".join([f'    "{tag}": ["string" or null],' for tag in compatibility_tags.keys()])
+    compatibility_json_str = compatibility_json_str.rstrip(',')  # Remove the last comma
+
+    # Replace placeholders in the template
+    full_prompt = prompt_template.replace("{CATEGORY}", category)
+    full_prompt = full_prompt.replace("{COMPATIBILITY_TAGS}", compatibility_tags_str)
+    full_prompt = full_prompt.replace("{COMPATIBILITY_JSON}", compatibility_json_str)
+
+    full_prompt += f"\n\nProduct title: {product_name}\n\nPlease provide the response in valid JSON format."
+    
+    response = query_perplexity_shared(full_prompt, model=model, cancelled=cancelled)
+    
+    try:
+        result = json.loads(response)
+        # with open(cache_file, 'wb') as f:
+        #     pickle.dump(result, f)
+        return result
+    except json.JSONDecodeError:
+        return response  # Return the raw response if not valid JSON
+
+def validate_product_info(category, product_info, model, cancelled=None):
+    validation_prompt = f"""
+    You are a specialized FPV drone part data validator. Please review and correct the following JSON data for a {category} product:
+
+    {json.dumps(product_info, indent=2)}
+
+    Please focus on the following tasks:
+    1. Ensure all compatibility tags are correct and relevant for the {category} category. 
+    2. Verify that the links are valid, if there are only a few links, check them manually or add more links that are accurate. 
+    3. Check that the prices are precise and accurate. They should be in the correct format (float).
+    4. Make sure the specifications are relevant and accurate for a {category} product. Only include specifications that are not already mentioned in the compatibility tags.
+
+    If you find any issues or have any corrections, please provide the full corrected JSON data. If everything is correct, simply return the original JSON data.
+
+    Your response should be a valid JSON object and nothing else.
+    """
+
+    validated_response = query_perplexity_shared(validation_prompt, model=model, cancelled=cancelled)
+    
+    try:
+        validated_info = json.loads(validated_response)
+        return validated_info
+    except json.JSONDecodeError:
+        print(f"Error decoding validated JSON: {validated_response}")
+        return product_info  # Return original data if validation fails
+
+def process_product_info(category, product_name, compatibility_tags, retrieval_model, validation_model, cancelled=None):
+    product_info = get_product_info(category, product_name, compatibility_tags, retrieval_model, cancelled)
+    if cancelled is not None and cancelled.is_set():
+        raise Cancelled()  # Skip validation for a caller that already gave up
+    if isinstance(product_info, dict):
+        return validate_product_info(category, product_info, validation_model, cancelled)
+    else:
+        return product_info
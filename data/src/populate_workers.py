@@ -0,0 +1,141 @@
+import os
+import time
+import socket
+import argparse
+import multiprocessing
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+from job_queue import JobQueue, Heartbeat
+from pipeline import COMPATIBILITY_DATA, process_product_info
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_MODEL = "llama-3.1-sonar-huge-128k-online"
+
+def get_queue(mongo_uri, lease_seconds, max_attempts):
+    client = MongoClient(mongo_uri)
+    db = client.droneFPVPartPicker
+    return db, JobQueue(db.populate_jobs, lease_seconds=lease_seconds, max_attempts=max_attempts)
+
+def enqueue_file(path, mongo_uri, lease_seconds, max_attempts):
+    _, queue = get_queue(mongo_uri, lease_seconds, max_attempts)
+    added = skipped = 0
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            category, _, product_name = line.partition(",")
+            category, product_name = category.strip(), product_name.strip()
+            if category not in COMPATIBILITY_DATA or not product_name:
+                print(f"Skipping invalid line: {line}")
+                skipped += 1
+                continue
+            if queue.enqueue(category, product_name):
+                added += 1
+            else:
+                skipped += 1
+    print(f"Enqueued {added} jobs ({skipped} skipped or already queued, use 'retry' to requeue failed jobs)")
+
+def retry_failed(mongo_uri, lease_seconds, max_attempts, category=None):
+    _, queue = get_queue(mongo_uri, lease_seconds, max_attempts)
+    print(f"Requeued {queue.retry_failed(category)} failed jobs")
+
+def process_job(queue, db, job, owner, process):
+    category, product_name = job["category"], job["product_name"]
+    print(f"[{owner}] {category}: {product_name} (attempt {job['attempts']})")
+    try:
+        with Heartbeat(queue, job, owner) as heartbeat:
+            result = process(category, product_name)
+        if heartbeat.lost:
+            print(f"[{owner}] Lost lease on {product_name}, discarding result")
+        elif not isinstance(result, dict):
+            queue.fail(job, owner, f"Unexpected response from Perplexity API: {result}")
+        elif queue.complete(job, owner, result, db):
+            print(f"[{owner}] Stored {product_name} in '{category}'")
+    except Exception as e:
+        print(f"[{owner}] Error processing {product_name}: {str(e)}")
+        queue.fail(job, owner, str(e))
+
+def work(queue, db, owner, process, poll_seconds, drain, reap_seconds=60):
+    # process(category, product_name) returns the part document to store.
+    # claim() already skips exhausted jobs, so reaping them into 'failed' only needs a timer.
+    last_reap = None
+    while True:
+        if last_reap is None or time.monotonic() - last_reap >= reap_seconds:
+            queue.reap_expired()
+            last_reap = time.monotonic()
+        job = queue.claim(owner)
+        if job is None:
+            if drain and not queue.has_unfinished():
+                queue.reap_expired()
+                break
+            time.sleep(poll_seconds)
+            continue
+        process_job(queue, db, job, owner, process)
+
+def run_worker(owner, mongo_uri, retrieval_model, validation_model, lease_seconds, max_attempts, poll_seconds, drain):
+    # Each spawned process builds its own Mongo connections
+    db, queue = get_queue(mongo_uri, lease_seconds, max_attempts)
+    print(f"[{owner}] started")
+
+    def process(category, product_name):
+        return process_product_info(category, product_name, COMPATIBILITY_DATA[category],
+                                    retrieval_model, validation_model)
+
+    work(queue, db, owner, process, poll_seconds, drain, reap_seconds=lease_seconds)
+    print(f"[{owner}] queue drained, exiting")
+
+def run_pool(processes, worker_args):
+    # Spawn instead of fork: MongoClient instances are not fork-safe
+    context = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    workers = []
+    for i in range(processes):
+        owner = f"{host}:{os.getpid()}:{i}"
+        process = context.Process(target=run_worker, args=(owner,) + worker_args)
+        process.start()
+        workers.append(process)
+    for process in workers:
+        process.join()
+
+def print_status(mongo_uri, lease_seconds, max_attempts):
+    _, queue = get_queue(mongo_uri, lease_seconds, max_attempts)
+    for status, count in queue.counts().items():
+        print(f"{status}: {count}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Populate the FPV parts database from a shared job queue")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI"))
+    parser.add_argument("--lease-seconds", type=int, default=120)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Add 'category,product name' lines from a file")
+    enqueue_parser.add_argument("file")
+
+    work_parser = subparsers.add_parser("work", help="Run worker processes on this host")
+    work_parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count())
+    work_parser.add_argument("--retrieval-model", default=DEFAULT_MODEL)
+    work_parser.add_argument("--validation-model", default=DEFAULT_MODEL)
+    work_parser.add_argument("--poll-seconds", type=float, default=5)
+    work_parser.add_argument("--drain", action="store_true", help="Exit once no pending or leased jobs remain")
+
+    retry_parser = subparsers.add_parser("retry", help="Requeue failed jobs with a fresh attempt count")
+    retry_parser.add_argument("--category")
+
+    subparsers.add_parser("status", help="Show job counts by status")
+
+    args = parser.parse_args()
+    if args.command == "enqueue":
+        enqueue_file(args.file, args.mongo_uri, args.lease_seconds, args.max_attempts)
+    elif args.command == "work":
+        worker_args = (args.mongo_uri, args.retrieval_model, args.validation_model,
+                       args.lease_seconds, args.max_attempts, args.poll_seconds, args.drain)
+        run_pool(args.processes, worker_args)
+    elif args.command == "retry":
+        retry_failed(args.mongo_uri, args.lease_seconds, args.max_attempts, args.category)
+    else:
+        print_status(args.mongo_uri, args.lease_seconds, args.max_attempts)
@@ -0,0 +1,46 @@
+import threading
+
+class Cancelled(Exception):
+    pass
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    # Coalesces concurrent identical calls: the first caller for a key runs fn,
+    # later callers wait for that run and share its result or exception.
+    # The leader always runs fn to completion so a caller that gives up never
+    # takes the result away from the others still waiting on it.
+    def __init__(self, poll_seconds=0.1):
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, cancelled=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            while not call.done.wait(self.poll_seconds):
+                if cancelled is not None and cancelled.is_set():
+                    raise Cancelled()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
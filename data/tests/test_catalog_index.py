@@ -0,0 +1,21 @@
+from catalog_index import ProductNameIndex
+
+def test_prefix_completion_is_case_insensitive_and_per_category():
+    index = ProductNameIndex()
+    for name in ["SpeedyBee F405 V4", "SpeedyBee F405 Mini", "Lumenier LUX F4", "SpeedyBee F405 V4"]:
+        index.add("flightcontrollers", name)
+    index.add("frames", "SpeedyBee Bee35")
+
+    assert index.complete("flightcontrollers", "speedybee f4") == ["SpeedyBee F405 Mini", "SpeedyBee F405 V4"]
+    assert index.complete("frames", "speedy") == ["SpeedyBee Bee35"]
+    assert index.complete("flightcontrollers", "") == []
+    assert index.complete("flightcontrollers", "speedy", limit=1) == ["SpeedyBee F405 Mini"]
+
+def test_contains_matches_whole_names_only():
+    index = ProductNameIndex()
+    index.add("frames", "Kabuki 228")
+    index.add("frames", "Kabuki 228 V2")
+
+    assert index.contains("frames", " kabuki 228 ")
+    assert not index.contains("frames", "Kabuki")
+    assert not index.contains("motors", "Kabuki 228")
@@ -0,0 +1,168 @@
+import threading
+
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from compatibility import CompatibilityEngine, canonical_values, CHANGE_STREAM_HISTORY_LOST
+
+FRAME = {"_id": "frame", "name": "Frame", "compatibilityTags": {
+    "Drone Type": ["Freestyle"], "Stack Mount": ["30.5x30.5mm"], "Motor Mount": ["4-16x16mm"]}}
+FC_30 = {"_id": "fc30", "name": "FC 30x30", "compatibilityTags": {"Size": ["30.5x30.5mm"], "Voltage": ["3S", "4S"]}}
+FC_20 = {"_id": "fc20", "name": "FC 20x20", "compatibilityTags": {"Size": ["20x20mm"]}}
+MOTOR = {"_id": "motor", "name": "Motor", "compatibilityTags": {"Mounting Pattern": ["4-M3-16x16mm"], "Voltage": ["6S"]}}
+ESC = {"_id": "esc", "name": "ESC", "compatibilityTags": {"Size": ["30.5x30.5mm"], "Voltage": ["3-6S"]}}
+
+def ids(results, category):
+    return sorted(part["_id"] for part in results[category])
+
+def test_canonical_values():
+    assert canonical_values("Motor Mount", "4-M3-16x16mm") == ["4-16x16mm"]
+    assert canonical_values("Cell Count", "3-6S") == ["3s", "4s", "5s", "6s"]
+    assert canonical_values("Shaft", "1.0mm") == canonical_values("Shaft", "1mm")
+
+def test_candidates_across_categories():
+    engine = CompatibilityEngine()
+    for category, document in [("frames", FRAME), ("flightcontrollers", FC_30), ("flightcontrollers", FC_20),
+                               ("motors", MOTOR), ("escs", ESC)]:
+        engine.upsert(category, document)
+
+    results = engine.candidates({"frames": "frame"})
+    assert ids(results, "flightcontrollers") == ["fc30"]
+    assert ids(results, "motors") == ["motor"]
+    assert ids(results, "escs") == ["esc"]
+
+    # The 6S motor rules out the 3-4S flight controller but not the 3-6S ESC
+    results = engine.candidates({"frames": "frame", "motors": "motor"})
+    assert ids(results, "flightcontrollers") == []
+    assert ids(results, "escs") == ["esc"]
+
+def test_incremental_update_and_remove():
+    engine = CompatibilityEngine()
+    engine.upsert("frames", FRAME)
+    engine.upsert("flightcontrollers", FC_30)
+    engine.upsert("flightcontrollers", dict(FC_30, compatibilityTags={"Size": ["20x20mm"]}))
+    assert ids(engine.candidates({"frames": "frame"}, ["flightcontrollers"]), "flightcontrollers") == []
+
+    engine.upsert("flightcontrollers", FC_30)
+    engine.remove("flightcontrollers", "fc30")
+    assert ids(engine.candidates({"frames": "frame"}, ["flightcontrollers"]), "flightcontrollers") == []
+
+class FakeStream:
+    def __init__(self, changes, error=None, token=None):
+        self.changes = changes
+        self.error = error
+        self.resume_token = token
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def __iter__(self):
+        for change in self.changes:
+            self.resume_token = change["_id"]
+            yield change
+            if change["operationType"] == "invalidate":
+                return  # Change streams close after an invalidate event
+        if self.error is not None:
+            raise self.error
+        threading.Event().wait()  # An open stream with no further events
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, *args):
+        return list(self.documents)
+
+class FakeDB:
+    def __init__(self, streams, collections=None):
+        self.streams = list(streams)
+        self.collections = collections or {}
+        self.calls = []
+        self.exhausted = threading.Event()
+
+    def watch(self, pipeline, **kwargs):
+        self.calls.append(kwargs)
+        if len(self.streams) == 1:
+            self.exhausted.set()
+        return self.streams.pop(0)
+
+    def __getitem__(self, name):
+        return FakeCollection(self.collections.get(name, []))
+
+def change(token, operation, category=None, document=None):
+    event = {"_id": token, "operationType": operation}
+    if category is not None:
+        event["ns"] = {"db": "droneFPVPartPicker", "coll": category}
+    if document is not None:
+        event["fullDocument"] = document
+        event["documentKey"] = {"_id": document["_id"]}
+    return event
+
+def test_watch_opens_stream_before_returning_and_resumes_after_errors():
+    db = FakeDB([
+        FakeStream([change("t1", "insert", "frames", FRAME)], error=AutoReconnect("blip"), token="t0"),
+        FakeStream([change("t2", "invalidate")]),
+        FakeStream([change("t3", "insert", "flightcontrollers", FC_30)])
+    ])
+    engine = CompatibilityEngine()
+    engine.watch(db, retry_seconds=0)
+    assert db.calls[0].get("start_after") is None  # Opened synchronously by watch()
+
+    assert db.exhausted.wait(5)
+    assert [call.get("start_after") for call in db.calls] == [None, "t1", "t2"]
+    for _ in range(100):
+        if "fc30" in engine.indexes["flightcontrollers"].rows:
+            break
+        threading.Event().wait(0.01)
+    assert ids(engine.candidates({"frames": "frame"}, ["flightcontrollers"]), "flightcontrollers") == ["fc30"]
+
+def test_watch_reloads_when_history_is_lost():
+    db = FakeDB([
+        FakeStream([], error=OperationFailure("history lost", code=CHANGE_STREAM_HISTORY_LOST), token="t0"),
+        FakeStream([], token="t9")
+    ], collections={"frames": [FRAME], "flightcontrollers": [FC_30]})
+    engine = CompatibilityEngine()
+    engine.watch(db, retry_seconds=0)
+
+    assert db.exhausted.wait(5)
+    for _ in range(100):
+        if "fc30" in engine.indexes["flightcontrollers"].rows:
+            break
+        threading.Event().wait(0.01)
+    assert db.calls[1].get("start_after") is None
+    assert ids(engine.candidates({"frames": "frame"}, ["flightcontrollers"]), "flightcontrollers") == ["fc30"]
+
+def wait_for(predicate):
+    for _ in range(100):
+        if predicate():
+            return True
+        threading.Event().wait(0.01)
+    return False
+
+def test_malformed_tags_are_ignored():
+    engine = CompatibilityEngine()
+    engine.upsert("frames", FRAME)
+    engine.upsert("flightcontrollers", {"_id": "bad", "name": "Bad", "compatibilityTags": ["30.5x30.5mm"]})
+    engine.upsert("flightcontrollers", {"_id": "nested", "name": "Nested", "compatibilityTags": {
+        "Size": {"width": 30.5}, "Voltage": [{"cells": 4}, "4S"]}})
+    results = engine.candidates({"frames": "frame"}, ["flightcontrollers"])
+    assert ids(results, "flightcontrollers") == ["bad", "nested"]
+    assert engine.indexes["flightcontrollers"].masks["Cell Count"][engine.indexes["flightcontrollers"].rows["nested"]]
+
+def test_watch_loads_on_follower_thread_and_skips_bad_changes():
+    stale = dict(FC_30, compatibilityTags={"Size": ["20x20mm"]})
+    bad = {"_id": "t2", "operationType": "insert", "ns": {"coll": "flightcontrollers"}, "fullDocument": {"name": "No id"}}
+    db = FakeDB([
+        FakeStream([change("t1", "update", "flightcontrollers", FC_30), bad,
+                    change("t3", "insert", "frames", FRAME)], token="t0")
+    ], collections={"flightcontrollers": [stale]})
+    engine = CompatibilityEngine()
+    engine.watch(db, retry_seconds=0)
+
+    assert engine.ready.wait(5)
+    assert wait_for(lambda: "frame" in engine.indexes["frames"].rows)
+    # The update made while loading is applied over the stale read, and the bad event is skipped
+    assert ids(engine.candidates({"frames": "frame"}, ["flightcontrollers"]), "flightcontrollers") == ["fc30"]
+    assert len(db.calls) == 1
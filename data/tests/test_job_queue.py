@@ -0,0 +1,161 @@
+import os
+import threading
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import job_queue
+from job_queue import JobQueue, PENDING, LEASED, DONE, FAILED
+from populate_workers import get_queue, work
+
+mongomock = pytest.importorskip("mongomock")
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_queue, "utcnow", clock)
+    return clock
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().droneFPVPartPicker
+
+@pytest.fixture
+def queue(db):
+    return JobQueue(db.populate_jobs, lease_seconds=60, max_attempts=3)
+
+def fake_part(category, product_name):
+    return {"name": product_name, "category": category}
+
+def test_enqueue_ignores_duplicates(queue):
+    assert queue.enqueue("frames", "Kabuki 228")
+    assert not queue.enqueue("frames", "Kabuki 228")
+    assert queue.counts()[PENDING] == 1
+
+def test_expired_lease_is_reclaimed_without_double_write(queue, db, clock):
+    queue.enqueue("frames", "Kabuki 228")
+
+    first = queue.claim("worker-a")
+    assert first["status"] == LEASED and first["attempts"] == 1
+    assert queue.claim("worker-b") is None  # Lease still held
+
+    clock.advance(61)
+    second = queue.claim("worker-b")
+    assert second["_id"] == first["_id"]
+    assert second["owner"] == "worker-b" and second["attempts"] == 2
+
+    # The original owner wakes up after losing its lease
+    assert not queue.heartbeat(first, "worker-a")
+    assert not queue.complete(first, "worker-a", fake_part("frames", "stale"), db)
+
+    assert queue.complete(second, "worker-b", fake_part("frames", "Kabuki 228"), db)
+    assert db.frames.count_documents({}) == 1
+    assert db.frames.find_one()["name"] == "Kabuki 228"
+    assert queue.counts()[DONE] == 1
+
+def test_rerun_after_partial_commit_replaces_document(queue, db, clock):
+    queue.enqueue("frames", "Kabuki 228")
+
+    # Worker a stores the part, then crashes before marking the job done
+    first = queue.claim("worker-a")
+    db.frames.replace_one({"_id": first["_id"]}, {"_id": first["_id"], "name": "partial"}, upsert=True)
+
+    clock.advance(61)
+    second = queue.claim("worker-b")
+    assert queue.complete(second, "worker-b", fake_part("frames", "Kabuki 228"), db)
+    assert db.frames.count_documents({}) == 1
+    assert db.frames.find_one()["name"] == "Kabuki 228"
+
+def test_exhausted_jobs_fail_and_can_be_retried(queue, db, clock):
+    queue.enqueue("motors", "2207 1960KV")
+    for _ in range(3):
+        job = queue.claim("worker-a")
+        assert queue.fail(job, "worker-a", "API error")
+    assert queue.claim("worker-a") is None
+    assert queue.counts()[FAILED] == 1
+    assert not queue.has_unfinished()
+
+    # Re-enqueueing does not reset a failed job, retry_failed does
+    assert not queue.enqueue("motors", "2207 1960KV")
+    assert queue.retry_failed() == 1
+    job = queue.claim("worker-a")
+    assert job["attempts"] == 1
+
+def test_lower_max_attempts_does_not_block_drain(db, clock):
+    generous = JobQueue(db.populate_jobs, lease_seconds=60, max_attempts=5)
+    generous.enqueue("escs", "SpeedyBee 50A")
+    for _ in range(3):
+        generous.fail(generous.claim("worker-a"), "worker-a", "API error")
+
+    strict = JobQueue(db.populate_jobs, lease_seconds=60, max_attempts=2)
+    assert not strict.has_unfinished()
+    work(strict, db, "worker-b", fake_part, poll_seconds=0, drain=True)
+    assert strict.counts()[FAILED] == 1
+
+def test_workers_drain_queue_after_crash(queue, db, clock):
+    names = [f"Frame {i}" for i in range(20)]
+    for name in names:
+        queue.enqueue("frames", name)
+
+    # A worker claims a job and dies without completing it
+    crashed = queue.claim("crashed")
+    clock.advance(61)
+
+    threads = [threading.Thread(target=work, args=(queue, db, f"worker-{i}", fake_part, 0, True)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not queue.complete(crashed, "crashed", fake_part("frames", "stale"), db)
+    assert queue.counts()[DONE] == len(names)
+    assert sorted(doc["name"] for doc in db.frames.find()) == sorted(names)
+
+def run_test_worker(owner, mongo_uri):
+    db, queue = get_queue(mongo_uri, lease_seconds=60, max_attempts=3)
+    work(queue, db, owner, fake_part, poll_seconds=0.1, drain=True)
+
+@pytest.mark.skipif(not os.getenv("MONGO_TEST_URI"), reason="set MONGO_TEST_URI to a local mongod")
+def test_worker_processes_against_local_mongod():
+    mongo_uri = os.getenv("MONGO_TEST_URI")
+    db, queue = get_queue(mongo_uri, lease_seconds=60, max_attempts=3)
+    db.client.drop_database(db.name)
+    db, queue = get_queue(mongo_uri, lease_seconds=60, max_attempts=3)
+
+    names = [f"Frame {i}" for i in range(50)]
+    for name in names:
+        queue.enqueue("frames", name)
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_test_worker, args=(f"worker-{i}", mongo_uri)) for i in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+
+    assert queue.counts()[DONE] == len(names)
+    assert sorted(doc["name"] for doc in db.frames.find()) == sorted(names)
+    db.client.drop_database(db.name)
+
+def test_expired_leases_are_claimed_before_pending_jobs(queue, clock):
+    queue.enqueue("frames", "First")
+    clock.advance(1)
+    queue.enqueue("frames", "Second")
+
+    crashed = queue.claim("crashed")
+    assert crashed["product_name"] == "First"
+    clock.advance(61)
+    assert queue.claim("worker-b")["product_name"] == "First"
+    assert queue.claim("worker-b")["product_name"] == "Second"
@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import threading
+
+import pytest
+
+import pipeline
+from singleflight import SingleFlight, Cancelled
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight(poll_seconds=0.01)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    time.sleep(0.2)  # Let the other callers attach before the leader returns
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["result"] * 5
+
+def test_cancelled_follower_leaves_others_waiting():
+    flight = SingleFlight(poll_seconds=0.01)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "result"
+
+    leader_result = []
+    leader = threading.Thread(target=lambda: leader_result.append(flight.do("key", slow)))
+    leader.start()
+    started.wait(5)
+
+    cancelled = threading.Event()
+    cancelled.set()
+    with pytest.raises(Cancelled):
+        flight.do("key", slow, cancelled=cancelled)
+
+    release.set()
+    leader.join()
+    assert leader_result == ["result"]
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight(poll_seconds=0.01)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def broken():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", broken)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    time.sleep(0.2)  # Let the follower attach before the leader raises
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert calls == [1]
+    assert errors == ["boom", "boom"]
+
+    # The failed call is not cached: the next caller runs fn again
+    with pytest.raises(ValueError):
+        flight.do("key", broken)
+    assert calls == [1, 1]
+
+def test_cancelled_caller_skips_validation(monkeypatch):
+    prompts = []
+    cancelled = threading.Event()
+
+    def fake_query(prompt, model="model"):
+        prompts.append(prompt)
+        cancelled.set()  # The caller gives up while retrieval is running
+        return json.dumps({"name": "Frame", "compatibilityTags": {}})
+
+    monkeypatch.setattr(pipeline, "query_perplexity", fake_query)
+    # prompts.md is read relative to the repository root
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    with pytest.raises(Cancelled):
+        pipeline.process_product_info("frames", "Frame", pipeline.COMPATIBILITY_DATA["frames"],
+                                      "model", "model", cancelled)
+    assert len(prompts) == 1